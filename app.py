@@ -1,7 +1,15 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from scipy import sparse
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, List, Tuple, Union
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; scoring falls back to SciPy/NumPy
+    njit = None
 
 # Topic definitions
 TOPICS = [
@@ -19,6 +27,20 @@ TOPICS = [
 
 TOPIC_KEYS = [t["key"] for t in TOPICS]
 TOPIC_LABELS = {t["key"]: f"{t['emoji']} {t['label']}" for t in TOPICS}
+TOPIC_INDEX = {k: i for i, k in enumerate(TOPIC_KEYS)}
+TOPIC_LABEL_BY_IDX = tuple(TOPIC_LABELS[k] for k in TOPIC_KEYS)
+
+# Max number of channels returned by a ranking
+RANKING_TOP_K = 50
+
+# Catalog size above which the Numba kernel (if installed) replaces SciPy scoring;
+# below it the one-off JIT compile costs far more than the matvec it replaces
+NUMBA_MIN_CHANNELS = 10_000
+
+# Fixed-point scale for quantized topic scores (used by the rankings table).
+# Seed confidences and the 0.05-step sliders are multiples of 0.01, so they
+# quantize exactly; other values are rounded to the nearest 0.01.
+TOPIC_SCORE_SCALE = 100
 
 # Preset user scenarios
 USER_SCENARIOS = {
@@ -98,6 +120,14 @@ USER_SCENARIOS = {
     },
 }
 
+def _prepare_scenarios(scenarios: Dict[str, Dict]):
+    """Attach each scenario's slider session state and score vector, applied in one update on click."""
+    for scenario in scenarios.values():
+        scenario["_slider_state"] = {f"slider_{k}": v for k, v in scenario["scores"].items()}
+        scenario["_vec"] = np.array([scenario["scores"][k] for k in TOPIC_KEYS], dtype=np.float32)
+
+_prepare_scenarios(USER_SCENARIOS)
+
 def check_password():
     """Returns `True` if the user had the correct password."""
     def password_entered():
@@ -115,7 +145,7 @@ def check_password():
         st.error("😕 Password incorrect")
     return False
 
-@dataclass
+@dataclass(slots=True)
 class UserProfile:
     """User's adaptive topic preferences"""
     topic_scores: Dict[str, float]
@@ -127,23 +157,92 @@ class UserProfile:
         """Set all topic scores at once"""
         self.topic_scores = scores.copy()
 
-def rank_channels(user_profile: UserProfile, channels: List[Dict]) -> List[Dict]:
-    """Rank channels by similarity to user's topic preferences."""
-    scored_channels = []
+def build_topic_csr(channels: List[Dict]) -> sparse.csr_matrix:
+    """Pack channel topic confidences into a sparse (channels x topics) CSR matrix.
+
+    Raises ValueError for a topic key not in TOPIC_KEYS.
+    """
+    rows, cols, vals = [], [], []
+    for i, channel in enumerate(channels):
+        for topic, confidence in channel.get('topics', {}).items():
+            if topic not in TOPIC_INDEX:
+                raise ValueError(f"Channel {channel.get('id')!r} has unknown topic {topic!r}")
+            rows.append(i)
+            cols.append(TOPIC_INDEX[topic])
+            vals.append(confidence)
+    return sparse.csr_matrix(
+        (vals, (rows, cols)),
+        shape=(len(channels), len(TOPIC_KEYS)),
+        dtype=np.float32
+    )
+
+def quantize_topic_csr(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    """Copy of a [0, 1] confidence CSR matrix stored as uint8 fixed point (TOPIC_SCORE_SCALE)."""
+    if matrix.nnz and (matrix.data.min() < 0 or matrix.data.max() > 1):
+        raise ValueError("Topic confidences must be in [0, 1] to quantize")
+    data = np.rint(matrix.data * TOPIC_SCORE_SCALE).astype(np.uint8)
+    return sparse.csr_matrix((data, matrix.indices, matrix.indptr), shape=matrix.shape)
+
+if njit is not None:
+    # Serial on purpose: Streamlit calls this from its script threads, and Numba's
+    # parallel workqueue layer is neither thread-safe nor clean to shut down there
+    @njit(fastmath=True, cache=True)
+    def _csr_scores_kernel(indptr, indices, data, user_vec, out):
+        """Write each CSR row's dot product with user_vec into out."""
+        for i in range(out.shape[0]):
+            s = 0
+            for p in range(indptr[i], indptr[i + 1]):
+                s += data[p] * user_vec[indices[p]]
+            out[i] = s
+
+def score_channels(
+    matrix: Union[np.ndarray, sparse.csr_matrix],
+    user_vec: np.ndarray,
+    top_k: int = RANKING_TOP_K
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Score every channel row against the user vector.
+
+    Returns (order, scores): the top_k row indices best match first, and per-row scores.
+    """
+    # A uint8 matrix holds fixed-point confidences: score in integers, rescale once
+    quantized = matrix.dtype == np.uint8
+    if quantized:
+        user_vec = np.rint(user_vec * TOPIC_SCORE_SCALE).astype(np.int32)
     
-    for channel in channels:
-        # Dot product of user preferences and channel topics
-        relevance = sum(
-            user_profile.topic_scores.get(topic, 0.5) * confidence
-            for topic, confidence in channel.get('topics', {}).items()
-        )
-        
-        scored_channels.append({
-            **channel,
-            'relevance_score': relevance
-        })
+    # Dot product of user preferences and channel topics, for all channels at once.
+    # With a CSR matrix this only touches the topics each channel actually has.
+    if njit is not None and sparse.issparse(matrix) and matrix.shape[0] >= NUMBA_MIN_CHANNELS:
+        scores = np.empty(matrix.shape[0], dtype=np.result_type(matrix.dtype, user_vec.dtype))
+        _csr_scores_kernel(matrix.indptr, matrix.indices, matrix.data, user_vec, scores)
+    else:
+        scores = np.asarray(matrix @ user_vec)
+    
+    if quantized:
+        scores = scores.astype(np.float32) / np.float32(TOPIC_SCORE_SCALE ** 2)
+    k = min(top_k, len(scores))
+    if k < len(scores):
+        # Only fully sort the top k; index-sorting first keeps tie order stable
+        top = np.sort(np.argpartition(-scores, k - 1)[:k])
+    else:
+        top = np.arange(len(scores))
+    order = top[np.argsort(-scores[top], kind="stable")]
+    return order, scores
+
+def rank_channels(user_scores: Dict[str, float], channels: List[Dict]) -> List[Tuple[Dict, float]]:
+    """Rank channels by similarity to user's topic preferences.
+
+    Returns (channel, relevance_score) pairs, best match first.
+    """
+    # Seed channels reuse the matrix built at import by the same builder
+    matrix = CHANNEL_TOPIC_CSR if channels is SEED_CHANNELS else build_topic_csr(channels)
+    user_vec = np.fromiter(
+        (user_scores.get(topic, 0.5) for topic in TOPIC_KEYS),
+        dtype=np.float32,
+        count=len(TOPIC_KEYS)
+    )
+    order, scores = score_channels(matrix, user_vec)
     
-    return sorted(scored_channels, key=lambda x: x['relevance_score'], reverse=True)
+    return [(channels[i], float(scores[i])) for i in order]
 
 # Expanded seed data with more variety and interesting edge cases
 SEED_CHANNELS = [
@@ -387,6 +486,42 @@ SEED_CHANNELS = [
     },
 ]
 
+# Channel data as parallel arrays (row i describes SEED_CHANNELS[i])
+CHANNEL_NAMES = np.array([c["name"] for c in SEED_CHANNELS], dtype=object)
+CHANNEL_TOPIC_CSR = build_topic_csr(SEED_CHANNELS)
+
+# Ranking reads the uint8 copy: a quarter of the float32 matrix's bytes
+CHANNEL_TOPIC_CSR_Q = quantize_topic_csr(CHANNEL_TOPIC_CSR)
+
+def _prepare_topic_display(channels: List[Dict]):
+    """Attach each channel's sorted topic pairs and display string; they are static, so format once."""
+    for channel in channels:
+        channel['_topic_idx_pairs'] = tuple(sorted(
+            ((TOPIC_INDEX[topic], conf) for topic, conf in channel['topics'].items()),
+            key=lambda x: -x[1]
+        ))
+        channel['_topics_str'] = ", ".join(
+            f"{TOPIC_LABEL_BY_IDX[i]} ({conf:.2f})" for i, conf in channel['_topic_idx_pairs']
+        )
+
+_prepare_topic_display(SEED_CHANNELS)
+CHANNEL_TOPICS_STR = np.array([c['_topics_str'] for c in SEED_CHANNELS], dtype=object)
+
+@st.cache_data(max_entries=128)
+def compute_ranking_table(user_vec: np.ndarray) -> pa.Table:
+    """Build the channel rankings table for a float32 topic score vector in TOPIC_KEYS order.
+
+    Scores use the uint8 quantized matrix, so user scores are rounded to 0.01.
+    """
+    order, scores = score_channels(CHANNEL_TOPIC_CSR_Q, user_vec)
+    
+    return pa.table({
+        "Rank": np.arange(1, len(order) + 1, dtype=np.int32),
+        "Channel": pa.array(CHANNEL_NAMES[order], type=pa.string()),
+        "Relevance": scores[order].astype(np.float32),
+        "Topics": pa.array(CHANNEL_TOPICS_STR[order], type=pa.string()),
+    })
+
 def main():
     st.set_page_config(page_title="Channel Ranking Prototype", layout="wide")
     
@@ -396,9 +531,8 @@ def main():
     st.title("🎯 Adaptive Channel Personalization")
     st.markdown("Adjust user topic preferences and see how channel rankings update in real-time.")
     
-    # Initialize topic scores in session state
-    if 'topic_scores' not in st.session_state:
-        st.session_state.topic_scores = {topic: 0.5 for topic in TOPIC_KEYS}
+    # Initialize topic scores in session state (float32, indexed by TOPIC_INDEX)
+    st.session_state.setdefault('user_vec', np.full(len(TOPIC_KEYS), 0.5, dtype=np.float32))
     
     # Remove this line entirely:
     # user_profile = st.session_state.user_profile
@@ -421,61 +555,47 @@ def main():
             use_container_width=True,
             key=f"btn_{scenario_key}"
         ):
-            st.session_state.topic_scores = scenario["scores"].copy()
+            st.session_state.user_vec = scenario["_vec"].copy()
             # Also update each slider's session state key
-            for topic_key, score_value in scenario["scores"].items():
-                st.session_state[f"slider_{topic_key}"] = score_value
+            st.session_state.update(scenario["_slider_state"])
             st.rerun()
     
     st.sidebar.markdown("---")
     st.sidebar.markdown("### 🎚️ Manual Adjustments")
-    st.sidebar.markdown("Adjust sliders to customize preferences")
+    st.sidebar.markdown("Adjust sliders, then click Apply to update rankings")
     
-    # Sliders for each topic
-    for topic_info in TOPICS:
-        key = topic_info["key"]
-        label = f"{topic_info['emoji']} {topic_info['label']}"
+    # Sliders for each topic, batched in a form so the app reruns once per Apply
+    with st.sidebar.form("prefs", clear_on_submit=False):
+        for topic_info in TOPICS:
+            key = topic_info["key"]
+            label = f"{topic_info['emoji']} {topic_info['label']}"
+            
+            st.slider(
+                label,
+                min_value=0.0,
+                max_value=1.0,
+                value=float(st.session_state.user_vec[TOPIC_INDEX[key]]),
+                step=0.05,
+                key=f"slider_{key}"
+            )
         
-        st.session_state.topic_scores[key] = st.sidebar.slider(
-            label,
-            min_value=0.0,
-            max_value=1.0,
-            value=st.session_state.topic_scores[key],
-            step=0.05,
-            key=f"slider_{key}"
-        )
+        st.form_submit_button("Apply", use_container_width=True)
+    
+    # Sliders keep their values under slider_* keys; mirror them in one pass
+    st.session_state.user_vec[:] = [st.session_state[f"slider_{key}"] for key in TOPIC_KEYS]
     
     # Main area: Channel rankings
     st.header("📊 Channel Rankings")
     
-    # Create UserProfile from session state for ranking
-    user_profile = UserProfile(TOPIC_KEYS)
-    user_profile.topic_scores = st.session_state.topic_scores
-    
-    # Rank channels
-    ranked_channels = rank_channels(user_profile, SEED_CHANNELS)
-    
-    # Display as table
-    display_data = []
-    for i, channel in enumerate(ranked_channels, 1):
-        # Get primary topics for display
-        topics_display = ", ".join([
-            f"{TOPIC_LABELS[topic]} ({conf:.2f})"
-            for topic, conf in sorted(
-                channel['topics'].items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )
-        ])
-        
-        display_data.append({
-            "Rank": i,
-            "Channel": channel['name'],
-            "Relevance": f"{channel['relevance_score']:.3f}",
-            "Topics": topics_display
-        })
-    
-    df = pd.DataFrame(display_data)
+    # Rank channels only when the score vector changed since the last rerun
+    user_vec = st.session_state.user_vec
+    if 'last_uv' in st.session_state and np.array_equal(st.session_state.last_uv, user_vec):
+        df = st.session_state.last_df
+    else:
+        df = compute_ranking_table(user_vec)
+        # Copy: user_vec is updated in place on later reruns
+        st.session_state.last_uv = user_vec.copy()
+        st.session_state.last_df = df
     
     # Style the dataframe
     st.dataframe(
@@ -485,7 +605,7 @@ def main():
         column_config={
             "Rank": st.column_config.NumberColumn(width="small"),
             "Channel": st.column_config.TextColumn(width="medium"),
-            "Relevance": st.column_config.NumberColumn(width="small"),
+            "Relevance": st.column_config.NumberColumn(format="%.3f", width="small"),
             "Topics": st.column_config.TextColumn(width="large"),
         }
     )
@@ -493,18 +613,13 @@ def main():
     # Show current user profile summary
     with st.expander("🔍 View User Profile Details"):
         st.markdown("### Current Topic Scores")
-        profile_df = pd.DataFrame([
-            {
-                "Topic": TOPIC_LABELS[key],
-                "Score": f"{score:.2f}",
-                "Bar": "█" * int(score * 20)
-            }
-            for key, score in sorted(
-                st.session_state.topic_scores.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )
-        ])
+        scores = st.session_state.user_vec
+        order = np.argsort(-scores, kind="stable")
+        profile_df = pd.DataFrame({
+            "Topic": np.array(TOPIC_LABEL_BY_IDX, dtype=object)[order],
+            "Score": np.char.mod("%.2f", scores[order]),
+            "Bar": np.char.multiply("█", np.rint(scores[order] * 20).astype(np.int32)),
+        })
         st.dataframe(profile_df, use_container_width=True, hide_index=True)
 
 if __name__ == "__main__":